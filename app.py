@@ -1,5 +1,9 @@
+import os
+
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pydeck as pdk
 import plotly.express as px
 import plotly.graph_objects as go
 import math
@@ -17,12 +21,47 @@ st.set_page_config(
 # --------------------------------
 # 3. LOADING AND PREPARING THE DATA
 # --------------------------------
+CSV_PATH = 'NorthAmericaViatorProducts_with_country_and_coords_full.csv'
+PARQUET_PATH = 'NorthAmericaViatorProducts_preprocessed.parquet'
+
+
 @st.cache_data
 def load_data():
+    # Serve the fully preprocessed frame from a Parquet sidecar when one
+    # exists and is newer than the CSV: Parquet stores the final dtypes
+    # (including the Categoricals), so a warm start skips CSV parsing and
+    # the preprocessing below entirely.
+    if (
+        os.path.exists(PARQUET_PATH)
+        and os.path.getmtime(PARQUET_PATH) >= os.path.getmtime(CSV_PATH)
+    ):
+        cached = pd.read_parquet(PARQUET_PATH)
+        # Rebuild if the sidecar predates the search_blob column
+        if "search_blob" in cached.columns:
+            return cached
+
     # df = pd.read_csv('NorthAmericaViatorProducts.csv')
-    df = pd.read_csv('NorthAmericaViatorProducts_with_country_and_coords_full.csv')
+    # The pyarrow engine parses the CSV multi-threaded, and spelling out the
+    # numeric dtypes skips pandas' per-column type inference pass.
+    # Only these columns are used anywhere in the app; skipping the other
+    # ~20 (descriptions, image URLs, prices, ...) cuts parse time and memory
+    df = pd.read_csv(
+        CSV_PATH,
+        engine="pyarrow",
+        usecols=[
+            "title", "location", "category", "country",
+            "rating_score", "rating_review_count",
+            "latitude", "longitude",
+        ],
+        dtype={
+            "rating_score": "float64",
+            "rating_review_count": "int64",
+            "latitude": "float64",
+            "longitude": "float64",
+        },
+    )
+
 
-    
     # We no longer split location into city/country.
     # Instead we just treat 'location' as 'city'.
     # If your "location" is more like "Whistler, British Columbia",
@@ -38,19 +77,191 @@ def load_data():
         'title': 'tour_name'
     })
     
-    # Convert rating_score to numeric (coerce invalid to NaN, fill with 0)
-    df["rating_score"] = pd.to_numeric(df["rating_score"], errors="coerce").fillna(0)
+    # rating_score is already float64 from the reader; just fill missing with 0
+    df["rating_score"] = df["rating_score"].fillna(0)
     
     # Fill NaN in 'category' with 'Uncategorized'
     df['category'] = df['category'].fillna('Uncategorized').astype(str)
     
     # Drop duplicates
     df = df.drop_duplicates(subset=['tour_name'], keep='first')
-    
+
+    # Precompute a lowercase "tour_name city" blob once, so the sidebar
+    # keyword search is a single plain-substring scan over one column
+    # instead of lowering and regex-matching two columns per keystroke
+    df["search_blob"] = (
+        df["tour_name"].fillna("").str.lower()
+        .str.cat(df["city"].fillna("").str.lower(), sep=" ")
+    )
+
+    # Store the repeated string columns as Categorical: groupby/isin then
+    # work on integer codes instead of hashing strings, and memory drops
+    # from one Python string per row to a small code per row.
+    for c in ("category", "country", "city"):
+        df[c] = df[c].astype("category")
+
+    # Write the sidecar so the next cold start can skip all of the above
+    df.to_parquet(PARQUET_PATH, index=False)
+
     return df
 
 df = load_data()
 
+
+# ------------------------------------------------
+# 3b. CACHED, FILTER-KEYED AGGREGATION HELPERS
+# ------------------------------------------------
+# The widget state (sliders + multiselects) is hashable, so we key every
+# expensive groupby/merge pipeline on it with @st.cache_data. Repeat filter
+# states then skip the recomputation entirely and hit the cache instead.
+
+def apply_filters(data, review_range, rating_range, countries, categories, search=""):
+    """Return the subset of `data` matching the sidebar filter state.
+
+    Builds one combined boolean mask and indexes once, instead of
+    allocating a new intermediate DataFrame per condition. `search` is
+    expected to be lowercase already.
+    """
+    mask = np.ones(len(data), dtype=bool)
+
+    # Country
+    if "All" not in countries:
+        mask &= data["country"].isin(countries).to_numpy()
+
+    # Category
+    if "All" not in categories:
+        mask &= data["category"].isin(categories).to_numpy()
+
+    # Review range (between() is a single C-level pass)
+    mask &= data["total_reviews"].between(*review_range, inclusive="both").to_numpy()
+
+    # Rating range
+    mask &= data["rating_score"].between(*rating_range, inclusive="both").to_numpy()
+
+    # Keyword search against the precomputed lowercase blob
+    # (regex=False keeps it a plain substring scan)
+    if search:
+        mask &= data["search_blob"].str.contains(search, regex=False, na=False).to_numpy()
+
+    return data[mask]
+
+
+@st.cache_data
+def compute_city_metrics(review_range, rating_range, countries, categories, search=""):
+    """Per-city metrics (tour count, reviews, rating, coords, top category)."""
+    filtered = apply_filters(df, review_range, rating_range, countries, categories, search)
+
+    # All numeric per-city metrics in a single groupby pass (one hash-table
+    # build instead of three, and no merges between them).
+    grouped = filtered.groupby(["city", "country"], observed=True)
+    city_metrics = grouped.agg(
+        total_tours=("tour_name", "size"),
+        total_reviews=("total_reviews", "sum"),
+        rating_score=("rating_score", "mean"),
+        latitude=("latitude", "first"),
+        longitude=("longitude", "first"),
+    ).reset_index()
+
+    # Most common category per city, computed on raw integer codes: fold
+    # each row's (group id, category code) into one flat key, count all
+    # rows with a single bincount, and argmax per group. Three numpy
+    # passes over the data, no per-group Python and no secondary
+    # groupby/merge. ngroup() numbers groups in the same sorted order the
+    # aggregation above uses, so the result aligns row-for-row.
+    n_groups = len(city_metrics)
+    if n_groups:
+        categories = filtered["category"].cat.categories
+        gids = grouped.ngroup().to_numpy()
+        cat_codes = filtered["category"].cat.codes.to_numpy()
+        counts = np.bincount(
+            gids * len(categories) + cat_codes,
+            minlength=n_groups * len(categories),
+        )
+        top_codes = counts.reshape(n_groups, len(categories)).argmax(axis=1)
+        city_metrics["category"] = categories[top_codes]
+    else:
+        city_metrics["category"] = pd.Series(dtype=filtered["category"].dtype)
+
+    # Fill NaN if any
+    city_metrics = city_metrics.fillna({
+        "total_tours": 0,
+        "total_reviews": 0,
+        "rating_score": 0,
+        "category": "Uncategorized"
+    })
+
+    return city_metrics
+
+
+@st.cache_data
+def compute_popular_cities(review_range, rating_range, countries, categories, search=""):
+    """Tab 2: per-city rollup with the concatenated category list."""
+    filtered = apply_filters(df, review_range, rating_range, countries, categories, search)
+
+    popular_cities_grouped = filtered.groupby(
+        ["city", "country"], as_index=False, observed=True
+    ).agg({
+        "tour_name": "count",
+        "total_reviews": "sum",
+        "rating_score": "mean",
+        "category": lambda cats: ", ".join(sorted(set(cats)))
+    })
+
+    popular_cities_grouped = popular_cities_grouped.rename(columns={
+        "tour_name": "total_tours"
+    })
+
+    popular_cities_grouped = popular_cities_grouped.sort_values(
+        "total_reviews", ascending=False
+    )
+
+    return popular_cities_grouped
+
+
+@st.cache_data
+def compute_category_metrics(review_range, rating_range, countries, categories, search=""):
+    """Tab 3: per-category totals for the treemap."""
+    filtered = apply_filters(df, review_range, rating_range, countries, categories, search)
+
+    category_metrics = filtered.groupby("category", observed=True).agg({
+        "tour_name": "count",
+        "rating_score": "mean",
+        "total_reviews": "sum"
+    }).reset_index().rename(columns={
+        "tour_name": "total_tours"
+    })
+
+    return category_metrics
+
+
+@st.cache_data
+def compute_sunburst_data(review_range, rating_range, countries, categories, search=""):
+    """Tab 4: country -> city -> category counts for the sunburst."""
+    filtered = apply_filters(df, review_range, rating_range, countries, categories, search)
+
+    # Only the three key columns are needed; dropping the rest keeps the
+    # groupby from carrying the wide frame along
+    return (
+        filtered[["country", "city", "category"]]
+        .groupby(["country", "city", "category"], observed=True)
+        .size()
+        .reset_index(name="count")
+    )
+
+
+@st.cache_data
+def compute_category_reviews(review_range, rating_range, countries, categories, search=""):
+    """Tab 5: per-category average rating and summed reviews."""
+    filtered = apply_filters(df, review_range, rating_range, countries, categories, search)
+
+    return filtered.groupby("category", as_index=False, observed=True).agg({
+        "rating_score": "mean",
+        "total_reviews": "sum"
+    }).rename(columns={
+        "rating_score": "avg_rating",
+        "total_reviews": "sum_reviews"
+    })
+
 # -----------------------
 # 4. TITLE AND DESCRIPTION
 # -----------------------
@@ -118,75 +329,30 @@ with st.sidebar:
     
     sort_order = st.selectbox("Sort Order", ["Descending", "Ascending"])
     
-    # # Search Bar
-    # st.subheader("Search by Keyword")
-    # search_query = st.text_input("🔎 Search tours/cities (optional)")
+    # Search Bar
+    st.subheader("Search by Keyword")
+    search_query = st.text_input("🔎 Search tours/cities (optional)")
 
 # --------------------------
 # 6. APPLY FILTERS TO DATAFRAME
 # --------------------------
-filtered_df = df.copy()
-
-# Country
-if "All" not in selected_countries:
-    filtered_df = filtered_df[filtered_df["country"].isin(selected_countries)]
-
-# Category
-if "All" not in selected_categories:
-    filtered_df = filtered_df[filtered_df["category"].isin(selected_categories)]
-
-# Review range
-filtered_df = filtered_df[
-    (filtered_df["total_reviews"] >= review_range[0]) &
-    (filtered_df["total_reviews"] <= review_range[1])
-]
-
-# Rating range
-filtered_df = filtered_df[
-    (filtered_df["rating_score"] >= selected_rating_range[0]) &
-    (filtered_df["rating_score"] <= selected_rating_range[1])
-]
-
-# # Keyword Search
-# if search_query:
-#     query_lower = search_query.lower()
-#     filtered_df = filtered_df[
-#         filtered_df["tour_name"].str.lower().str.contains(query_lower) |
-#         filtered_df["city"].str.lower().str.contains(query_lower)
-#     ]
+# Multiselect values come back as lists; convert to tuples so the filter
+# state is hashable and usable as a cache key.
+countries_key = tuple(selected_countries)
+categories_key = tuple(selected_categories)
+search_key = search_query.strip().lower()
+
+filtered_df = apply_filters(
+    df, review_range, selected_rating_range, countries_key, categories_key, search_key
+)
 
 # ---------------------------
 # 7. CALCULATE CITY METRICS
 # ---------------------------
 try:
-    # Group by city and country to get tour counts
-    tour_counts = filtered_df.groupby(["city", "country"]).size().reset_index(name="total_tours")
-    
-    # Aggregated metrics
-    city_stats = filtered_df.groupby(["city", "country"]).agg({
-        "total_reviews": "sum",
-        "rating_score": "mean",
-        "latitude": "first",
-        "longitude": "first"
-    }).reset_index()
-    
-    # Most common category per city
-    city_categories = filtered_df.groupby(["city", "country"])["category"].apply(
-        lambda x: x.mode().iloc[0] if not x.empty else "Uncategorized"
-    ).reset_index()
-    
-    # Merge all metrics
-    city_metrics = tour_counts.merge(city_stats, on=["city", "country"])
-    city_metrics = city_metrics.merge(city_categories, on=["city", "country"])
-    
-    # Fill NaN if any
-    city_metrics = city_metrics.fillna({
-        "total_tours": 0,
-        "total_reviews": 0,
-        "rating_score": 0,
-        "category": "Uncategorized"
-    })
-    
+    city_metrics = compute_city_metrics(
+        review_range, selected_rating_range, countries_key, categories_key, search_key
+    )
 except Exception as e:
     st.error(f"Error calculating city metrics: {str(e)}")
     st.stop()
@@ -202,59 +368,139 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "Reviews vs Ratings"
 ])
 
+# Viridis anchor colors used to shade the map circles by total_tours
+# (deck.gl has no built-in continuous color scale, so we interpolate here)
+VIRIDIS_ANCHORS = np.array([
+    [68, 1, 84],
+    [59, 82, 139],
+    [33, 145, 140],
+    [94, 201, 98],
+    [253, 231, 37],
+], dtype=float)
+
+
+def viridis_rgb(values):
+    """Map a numeric Series onto interpolated Viridis RGB components."""
+    v = values.to_numpy(dtype=float)
+    vmax = v.max() if len(v) else 0.0
+    t = v / vmax if vmax > 0 else np.zeros_like(v)
+    idx = t * (len(VIRIDIS_ANCHORS) - 1)
+    lo = np.floor(idx).astype(int)
+    hi = np.minimum(lo + 1, len(VIRIDIS_ANCHORS) - 1)
+    frac = (idx - lo)[:, None]
+    return (VIRIDIS_ANCHORS[lo] * (1 - frac) + VIRIDIS_ANCHORS[hi] * frac).astype(int)
+
+
+# Cap on how many circles the map draws at once; above this, nearby
+# cities are merged into grid cells (supercluster-style) so the renderer
+# and the tooltip picker never have to handle an unbounded point count.
+MAX_MAP_POINTS = 1500
+
+# Cap on how many rows a ranking table serializes into the page
+MAX_TABLE_ROWS = 1000
+
+
+def bin_map_points(points, cell_deg=0.5):
+    """Aggregate map points into a lat/lon grid of `cell_deg`-degree cells.
+
+    Each cell keeps its busiest city as the representative (name and
+    position), sums tours and reviews, and averages the rating.
+    """
+    binned = points.copy()
+    binned["_lat_bin"] = (binned["latitude"] / cell_deg).round()
+    binned["_lon_bin"] = (binned["longitude"] / cell_deg).round()
+
+    # Sort so "first" per cell picks the city with the most tours
+    binned = binned.sort_values("total_tours", ascending=False)
+    return binned.groupby(["_lat_bin", "_lon_bin"], as_index=False).agg(
+        city=("city", "first"),
+        country=("country", "first"),
+        latitude=("latitude", "first"),
+        longitude=("longitude", "first"),
+        total_tours=("total_tours", "sum"),
+        total_reviews=("total_reviews", "sum"),
+        rating_score=("rating_score", "mean"),
+        n_cities=("city", "size"),
+    )
+
+
+@st.cache_data
+def compute_map_points(review_range, rating_range, countries, categories, search=""):
+    """Render-ready Tab 1 points: filtered, clustered, sized and colored.
+
+    Memoized on the filter state like the other aggregations, so a rerun
+    that only touches another tab's widgets skips the dropna/clustering/
+    clip/color work entirely.
+    """
+    points = compute_city_metrics(
+        review_range, rating_range, countries, categories, search
+    ).dropna(subset=["latitude", "longitude"])
+
+    # Merge nearby cities into grid cells once there are too many points
+    # to render individually; the representative keeps a "(+N nearby)" tag
+    if len(points) > MAX_MAP_POINTS:
+        points = bin_map_points(points)
+        points["label"] = np.where(
+            points["n_cities"] > 1,
+            points["city"].astype(str)
+            + " (+" + (points["n_cities"] - 1).astype(str) + " nearby)",
+            points["city"].astype(str),
+        )
+    else:
+        points["label"] = points["city"].astype(str)
+
+    # Circle radius in meters, so bigger circles == more tours
+    points["radius"] = (points["total_tours"] * 400.0).clip(2000.0, 40000.0)
+
+    # Color scale based on total_tours
+    rgb = viridis_rgb(points["total_tours"])
+    points["r"], points["g"], points["b"] = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    points["rating_display"] = points["rating_score"].round(2)
+
+    return points[[
+        "latitude", "longitude", "radius", "r", "g", "b",
+        "label", "country", "total_tours", "total_reviews", "rating_display"
+    ]]
+
+
 # ---- Tab 1: Map ----
 with tab1:
     st.header("Cities in North America with Viator Tours – Highlighted by Number of Tours")
-    st.markdown("*Hover over circles to see city stats. Color bar on the right shows total tours.*")
-
-    # Sort city_metrics for consistent sizing
-    city_metrics_sorted = city_metrics.sort_values("total_tours", ascending=True)
-
-    # Create a "circle_size" so bigger circles == more tours
-    city_metrics_sorted["circle_size"] = (city_metrics_sorted["total_tours"] * 0.5).clip(lower=2)
-
-    # Drop rows missing lat/lon to avoid Plotly errors
-    city_metrics_sorted = city_metrics_sorted.dropna(subset=["latitude", "longitude"])
-
-    # Build the figure
-    fig_map = px.scatter_mapbox(
-        city_metrics_sorted,
-        lat="latitude",
-        lon="longitude",
-        size="circle_size",
-        color="total_tours",            # color scale based on total_tours
-        hover_name="city",              # city name appears on hover
-        hover_data={
-            "country": True,
-            "total_tours": True,
-            "total_reviews": True,
-            "rating_score": ":.2f"
-        },
-        color_continuous_scale="Viridis",
-        size_max=40,
-        zoom=3.5,  
-        center={"lat": 30, "lon": -95},  # Adjust for NA
-        labels={"total_tours": "TotalCityTourCount"}
+    st.markdown("*Hover over circles to see city stats. Brighter circles have more tours.*")
+
+    # Render-ready points come out of the cached helper; pydeck/deck.gl
+    # renders them on the GPU, so this stays smooth even with every city
+    # visible at once (plotly's SVG scatter did not).
+    map_points = compute_map_points(
+        review_range, selected_rating_range, countries_key, categories_key, search_key
     )
 
-    fig_map.update_layout(
-        mapbox_style="open-street-map",
-        height=600,
-        margin={"r":0, "t":0, "l":0, "b":0},
+    layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=map_points,
+        get_position="[longitude, latitude]",
+        get_radius="radius",
+        get_fill_color="[r, g, b, 170]",
+        pickable=True,
+        stroked=False,
     )
 
-    fig_map.update_layout(
-        coloraxis_colorbar=dict(
-            title="TotalCityTourCount",
-            orientation="v",
-            yanchor="middle",
-            xanchor="left",
-            x=0.98,
-            y=0.5
-        )
+    deck = pdk.Deck(
+        layers=[layer],
+        initial_view_state=pdk.ViewState(latitude=30, longitude=-95, zoom=3.5),
+        map_style="light",
+        # Plain-text tooltip: deck.gl swaps a single text node on hover
+        # instead of re-parsing an HTML fragment on every mousemove
+        tooltip={
+            "text": (
+                "{label}, {country}\n"
+                "Tours: {total_tours} | Reviews: {total_reviews} | "
+                "Avg rating: {rating_display}"
+            )
+        },
     )
 
-    st.plotly_chart(fig_map, use_container_width=True)
+    st.pydeck_chart(deck, use_container_width=True)
 
 # ---- Tab 2: Detailed Rankings ----
 with tab2:
@@ -270,21 +516,29 @@ with tab2:
     ascending_bool = (sort_order == "Ascending")
     
     st.subheader("Most Popular Tours in North America")
+    # Attach each tour's city-level tour count via a dict-style Series map
+    # instead of a merge: no join machinery, and no row duplication when
+    # the same city name shows up under two countries. The lookup is keyed
+    # on (city, country) — city_metrics is aggregated per pair, so mapping
+    # on the city name alone would hand San Diego, US the count of its
+    # Mexican namesake.
+    city_tour_counts = city_metrics.set_index(["city", "country"])["total_tours"]
+    row_keys = pd.MultiIndex.from_frame(filtered_df[["city", "country"]])
+    sorted_tours = filtered_df.assign(
+        total_tours=row_keys.map(city_tour_counts)
+    )
     if sort_column == "Total Tours":
-        city_ordered = city_metrics.sort_values(
-            "total_tours", ascending=ascending_bool
-        )[["city", "total_tours"]]
-        sorted_tours = pd.merge(
-            filtered_df, city_ordered, on="city"
-        ).sort_values("total_tours", ascending=ascending_bool)
+        # Sorting by a city-level value doesn't need a row-level
+        # sort_values: rank the few hundred (city, country) pairs once,
+        # map each tour to its pair's rank, then reorder the rows
+        # positionally with take(). The stable argsort keeps tours of the
+        # same city in their original order.
+        city_rank = city_tour_counts.sort_values(ascending=ascending_bool)
+        city_rank = pd.Series(np.arange(len(city_rank)), index=city_rank.index)
+        order = np.argsort(row_keys.map(city_rank).to_numpy(), kind="stable")
+        sorted_tours = sorted_tours.take(order)
     else:
-        sorted_tours = filtered_df.sort_values(sort_col, ascending=ascending_bool)
-        sorted_tours = pd.merge(
-            sorted_tours,
-            city_metrics[["city", "total_tours"]],
-            on="city",
-            how="left"
-        )
+        sorted_tours = sorted_tours.sort_values(sort_col, ascending=ascending_bool)
     
     tours_display = sorted_tours[[
         "country", "city", "category", 
@@ -292,28 +546,27 @@ with tab2:
     ]].copy()
     
     tours_display.insert(0, "Position", range(1, len(tours_display) + 1))
-    
+
+    # Only ship the top rows to the browser: st.dataframe serializes the
+    # whole frame into the page, and nobody scrolls past the first
+    # thousand entries of a ranking anyway
+    total_tours_count = len(tours_display)
+    if total_tours_count > MAX_TABLE_ROWS:
+        tours_display = tours_display.head(MAX_TABLE_ROWS)
+        st.caption(
+            f"Showing the top {MAX_TABLE_ROWS:,} of {total_tours_count:,} tours — "
+            "narrow the filters to see the rest."
+        )
+
     st.dataframe(tours_display, use_container_width=True, hide_index=True)
     
     st.subheader("Most Popular Cities in North America (Grouped by City)")
-    # Group by city (and country), aggregating columns
-    popular_cities_grouped = filtered_df.groupby(
-        ["city", "country"], as_index=False
-    ).agg({
-        "tour_name": "count",
-        "total_reviews": "sum",
-        "rating_score": "mean",
-        "category": lambda cats: ", ".join(sorted(set(cats)))
-    })
-    
-    popular_cities_grouped = popular_cities_grouped.rename(columns={
-        "tour_name": "total_tours"
-    })
-    
-    popular_cities_grouped = popular_cities_grouped.sort_values(
-        "total_reviews", ascending=False
+    # Group by city (and country), aggregating columns (cached per filter
+    # state; st.cache_data hands back a fresh copy, so mutating it is safe)
+    popular_cities_grouped = compute_popular_cities(
+        review_range, selected_rating_range, countries_key, categories_key, search_key
     )
-    
+
     popular_cities_grouped.insert(0, "Position", range(1, len(popular_cities_grouped) + 1))
     
     st.dataframe(
@@ -330,14 +583,10 @@ with tab2:
 with tab3:
     st.header("📈 Category Analysis")
     
-    # Keep the Treemap if you like it
-    category_metrics = filtered_df.groupby("category").agg({
-        "tour_name": "count",
-        "rating_score": "mean",
-        "total_reviews": "sum"
-    }).reset_index().rename(columns={
-        "tour_name": "total_tours"
-    })
+    # Keep the Treemap if you like it (aggregation cached per filter state)
+    category_metrics = compute_category_metrics(
+        review_range, selected_rating_range, countries_key, categories_key, search_key
+    )
     
     fig_treemap = px.treemap(
         category_metrics,
@@ -382,7 +631,9 @@ with tab4:
     st.header("🔍 Tour Hierarchy")
     st.markdown("*Interactive visualization showing the relationship between countries, cities, and tour categories*")
     
-    sunburst_data = filtered_df.groupby(["country", "city", "category"]).size().reset_index(name="count")
+    sunburst_data = compute_sunburst_data(
+        review_range, selected_rating_range, countries_key, categories_key, search_key
+    )
     
     # Option A: Set width and height in the px.sunburst call
     fig_sunburst = px.sunburst(
@@ -408,14 +659,10 @@ with tab5:
     st.header("⭐ Reviews vs Ratings")
     st.markdown("*Relationship between average rating and total reviews across categories*")
 
-    # 1. Group by category
-    cat_agg_all = filtered_df.groupby("category", as_index=False).agg({
-        "rating_score": "mean",
-        "total_reviews": "sum"
-    }).rename(columns={
-        "rating_score": "avg_rating",
-        "total_reviews": "sum_reviews"
-    })
+    # 1. Group by category (cached per filter state)
+    cat_agg_all = compute_category_reviews(
+        review_range, selected_rating_range, countries_key, categories_key, search_key
+    )
 
     # 2. Separate out "Self-guided Tours" from others
     sgt_df = cat_agg_all[cat_agg_all["category"] == "Self-guided Tours"]
@@ -9,8 +9,16 @@ the ENTIRE CSV with updated lat/long values.
 
 Requires: pip install geopy
 Note: Observe Nominatim usage policies if you have many rows.
+
+By default this hits the public Nominatim server (1 request/second,
+single worker). Point NOMINATIM_DOMAIN at a self-hosted Nominatim or
+Photon instance (e.g. "localhost:8080") to drop the rate limit and
+fan the lookups out over GEOCODE_WORKERS threads.
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
@@ -18,6 +26,10 @@ from geopy.extra.rate_limiter import RateLimiter
 INPUT_CSV = "NorthAmericaViatorProducts_with_country.csv"
 OUTPUT_CSV = "NorthAmericaViatorProducts_with_country_and_coords.csv"  # Overwrite original file (or specify a new file)
 
+PUBLIC_DOMAIN = "nominatim.openstreetmap.org"
+NOMINATIM_DOMAIN = os.environ.get("NOMINATIM_DOMAIN", PUBLIC_DOMAIN)
+GEOCODE_WORKERS = int(os.environ.get("GEOCODE_WORKERS", "8"))
+
 def main():
     # 1. Load the entire CSV into df
     df = pd.read_csv(INPUT_CSV)
@@ -32,33 +44,58 @@ def main():
         print("No missing coords to fill. Exiting without changes.")
         return
 
-    # 3. Initialize geocoder + rate limiter
-    geolocator = Nominatim(user_agent="forward-geocode-script")
-    geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1)
-
-    # 4. Forward-geocode each row that has missing coords
-    for i, row in df_missing_coords.iterrows():
-        location_str = row.get("location", None)
-
+    # 3. Initialize geocoder (+ rate limiter and single worker on the
+    #    public server; unthrottled thread pool against a local instance)
+    on_public_server = NOMINATIM_DOMAIN == PUBLIC_DOMAIN
+    geolocator = Nominatim(
+        user_agent="forward-geocode-script",
+        domain=NOMINATIM_DOMAIN,
+        scheme="https" if on_public_server else "http",
+    )
+    if on_public_server:
+        geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1)
+        workers = 1
+    else:
+        geocode = geolocator.geocode
+        workers = GEOCODE_WORKERS
+    print(f"Geocoding via {NOMINATIM_DOMAIN} with {workers} worker(s).")
+
+    # 4. Forward-geocode each UNIQUE location string once. Many rows share
+    #    the same location, so this collapses the network calls to one per
+    #    distinct string. Lookups run concurrently; all writes to df happen
+    #    in the main thread afterwards.
+    unique_locations = sorted({
+        loc for loc in df_missing_coords["location"]
         # Skip if 'location' is empty or not a string
-        if not isinstance(location_str, str) or not location_str.strip():
-            continue
+        if isinstance(loc, str) and loc.strip()
+    })
+    print(f"{len(unique_locations)} unique locations to geocode "
+          f"(down from {missing_count} rows).")
 
+    def lookup(location_str):
         try:
-            location = geocode(location_str, language="en")
-            if location:
-                new_lat = location.latitude
-                new_lon = location.longitude
-
-                # Update the row in the main df
-                df.at[i, "latitude"] = new_lat
-                df.at[i, "longitude"] = new_lon
-
-                print(f"[Row {i}] '{location_str}' -> lat={new_lat}, lon={new_lon}")
-            else:
-                print(f"[Row {i}] '{location_str}' -> No geocode result found")
+            return location_str, geocode(location_str, language="en"), None
         except Exception as e:
-            print(f"[Row {i}] '{location_str}' -> Error: {e}")
+            return location_str, None, e
+
+    coords_by_location = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for location_str, location, error in pool.map(lookup, unique_locations):
+            if error is not None:
+                print(f"'{location_str}' -> Error: {error}")
+            elif location:
+                coords_by_location[location_str] = (location.latitude, location.longitude)
+                print(f"'{location_str}' -> lat={location.latitude}, lon={location.longitude}")
+            else:
+                print(f"'{location_str}' -> No geocode result found")
+
+    # Map the results back onto every row that shares the location string,
+    # as two column-level assignments instead of per-cell df.at writes
+    new_lat = df_missing_coords["location"].map({k: v[0] for k, v in coords_by_location.items()})
+    new_lon = df_missing_coords["location"].map({k: v[1] for k, v in coords_by_location.items()})
+    filled = new_lat.notna()
+    df.loc[new_lat.index[filled], "latitude"] = new_lat[filled]
+    df.loc[new_lon.index[filled], "longitude"] = new_lon[filled]
 
     # 5. Save the entire df (including updated rows) back to CSV
     df.to_csv(OUTPUT_CSV, index=False)
@@ -3,58 +3,62 @@
 """
 geocode_countries.py
 
-Use this script to read 'NorthAmericaViatorProducts.csv',
-reverse-geocode the latitude/longitude, and produce a new CSV
-with a 'country' column. Then your Streamlit app can read
-this new CSV without performing geocoding in real-time.
+Use this script to read 'NorthAmericaViatorProducts.csv', attach a
+'country' column, and produce a new CSV. Then your Streamlit app can
+read this new CSV without performing geocoding in real-time.
+
+Instead of reverse-geocoding every row through Nominatim (one network
+call per row, 1 req/s), this resolves all countries offline with a
+single vectorized point-in-polygon join against a Natural Earth
+country-boundaries shapefile.
+
+Download the (public domain) shapefile once, e.g.:
+    https://naturalearth.s3.amazonaws.com/10m_cultural/ne_10m_admin_0_countries.zip
+and set COUNTRIES_SHAPEFILE to the .zip (geopandas reads it directly)
+or to the extracted .shp.
+
+Requires: pip install geopandas
 """
 
+import geopandas as gpd
 import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
-import time
 
 INPUT_CSV = "NorthAmericaViatorProducts.csv"
 OUTPUT_CSV = "NorthAmericaViatorProducts_with_country.csv"
+COUNTRIES_SHAPEFILE = "ne_10m_admin_0_countries.zip"
 
 def main():
     # 1. Load your CSV
     df = pd.read_csv(INPUT_CSV)
 
-    # 2. Initialize geocoder + rate limiter
-    geolocator = Nominatim(user_agent="offline-geocode-script")
-    reverse = RateLimiter(geolocator.reverse, min_delay_seconds=1) 
-    # -> 1 second between calls to avoid rate limit
-
-    # 3. Prepare a 'country' column to fill
-    df["country"] = None  # or "Unknown"
-
-    # 4. Reverse Geocode each row that has lat/lon
-    for i, row in df.iterrows():
-        lat = row.get("latitude", None)
-        lon = row.get("longitude", None)
-
-        # Skip if lat/lon is missing or already have a country
-        if pd.isna(lat) or pd.isna(lon):
-            df.at[i, "country"] = "Unknown"
-            continue
-
-        try:
-            location = reverse((lat, lon), language="en")
-            if location and "address" in location.raw:
-                addr = location.raw["address"]
-                country_name = addr.get("country", "Unknown")
-            else:
-                country_name = "Unknown"
-        except Exception as e:
-            country_name = "Unknown"
-
-        df.at[i, "country"] = country_name
-
-        # (Optional) Print progress
-        print(f"{i+1}/{len(df)}: lat={lat}, lon={lon} -> {country_name}")
-    
-    # 5. Save to new CSV
+    # 2. Load the offline country polygons (NAME = English country name)
+    countries = gpd.read_file(COUNTRIES_SHAPEFILE)[["NAME", "geometry"]]
+
+    # 3. Build a point GeoDataFrame from the rows that have lat/lon
+    has_coords = df["latitude"].notna() & df["longitude"].notna()
+    points = gpd.GeoDataFrame(
+        index=df.index[has_coords],
+        geometry=gpd.points_from_xy(
+            df.loc[has_coords, "longitude"],
+            df.loc[has_coords, "latitude"],
+        ),
+        crs=countries.crs,
+    )
+
+    # 4. One spatial join resolves every point at once — no per-row
+    #    network calls, no rate limiting
+    joined = gpd.sjoin(points, countries, how="left", predicate="within")
+    # A point sitting exactly on a shared border can match twice; keep one
+    joined = joined[~joined.index.duplicated(keep="first")]
+
+    # 5. Attach the 'country' column ("Unknown" where no coords or no match)
+    df["country"] = "Unknown"
+    df.loc[joined.index, "country"] = joined["NAME"].fillna("Unknown")
+
+    matched = (df["country"] != "Unknown").sum()
+    print(f"Resolved {matched}/{len(df)} rows to a country offline.")
+
+    # 6. Save to new CSV
     df.to_csv(OUTPUT_CSV, index=False)
     print(f"\nDone! Wrote '{OUTPUT_CSV}' with country column.")
 
@@ -13,8 +13,16 @@ values if geocoding is successful.
 Requires: pip install geopy
 
 Be sure to comply with Nominatim usage policies if you have many rows.
+
+By default this hits the public Nominatim server (1 request/second,
+single worker). Point NOMINATIM_DOMAIN at a self-hosted Nominatim or
+Photon instance (e.g. "localhost:8080") to drop the rate limit and
+fan the lookups out over GEOCODE_WORKERS threads.
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
@@ -22,6 +30,10 @@ from geopy.extra.rate_limiter import RateLimiter
 INPUT_CSV = "NorthAmericaViatorProducts_with_country_and_coords.csv"
 OUTPUT_CSV = "NorthAmericaViatorProducts_with_country_and_coords_full.csv"  # Overwrite existing file, or set a new name
 
+PUBLIC_DOMAIN = "nominatim.openstreetmap.org"
+NOMINATIM_DOMAIN = os.environ.get("NOMINATIM_DOMAIN", PUBLIC_DOMAIN)
+GEOCODE_WORKERS = int(os.environ.get("GEOCODE_WORKERS", "8"))
+
 def main():
     # 1. Load your CSV
     df = pd.read_csv(INPUT_CSV)
@@ -36,35 +48,57 @@ def main():
         print("No 'Unknown' countries to update. Exiting.")
         return
 
-    # 3. Initialize geocoder + rate limiter
-    geolocator = Nominatim(user_agent="update-unknown-countries-script")
-    reverse = RateLimiter(geolocator.reverse, min_delay_seconds=1)
-    # -> 1 query per second to avoid rate-limits on Nominatim
-
-    # 4. Loop over rows with 'Unknown' country; fill if lat/lon is valid
-    for i, row in df_missing_country.iterrows():
-        lat = row.get("latitude", None)
-        lon = row.get("longitude", None)
-        
-        if pd.isna(lat) or pd.isna(lon):
-            # If there's no lat/lon for this row, we can't do reverse geocoding
-            # We'll leave it as "Unknown"
-            continue
+    # 3. Initialize geocoder (+ rate limiter and single worker on the
+    #    public server; unthrottled thread pool against a local instance)
+    on_public_server = NOMINATIM_DOMAIN == PUBLIC_DOMAIN
+    geolocator = Nominatim(
+        user_agent="update-unknown-countries-script",
+        domain=NOMINATIM_DOMAIN,
+        scheme="https" if on_public_server else "http",
+    )
+    if on_public_server:
+        reverse = RateLimiter(geolocator.reverse, min_delay_seconds=1)
+        workers = 1
+    else:
+        reverse = geolocator.reverse
+        workers = GEOCODE_WORKERS
+    print(f"Geocoding via {NOMINATIM_DOMAIN} with {workers} worker(s).")
 
+    # 4. Reverse-geocode the rows with 'Unknown' country that have a valid
+    #    lat/lon. Lookups run concurrently; results are collected in a dict
+    #    in the main thread and written back in one .loc assignment instead
+    #    of per-cell df.at writes inside the loop.
+    def lookup(task):
+        i, lat, lon = task
         try:
             location = reverse((lat, lon), language="en")
             if location and "address" in location.raw:
                 addr = location.raw["address"]
-                country_name = addr.get("country", "Unknown")
-            else:
-                country_name = "Unknown"
+                return i, lat, lon, addr.get("country", "Unknown"), None
+            return i, lat, lon, "Unknown", None
         except Exception as e:
-            print(f"[Row {i}] Reverse geocode error: {e}")
-            country_name = "Unknown"
+            return i, lat, lon, "Unknown", e
+
+    tasks = [
+        (i, row.get("latitude", None), row.get("longitude", None))
+        for i, row in df_missing_country.iterrows()
+        # If there's no lat/lon for this row, we can't do reverse geocoding
+        # We'll leave it as "Unknown"
+        if not pd.isna(row.get("latitude", None)) and not pd.isna(row.get("longitude", None))
+    ]
+
+    resolved = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, lat, lon, country_name, error in pool.map(lookup, tasks):
+            if error is not None:
+                print(f"[Row {i}] Reverse geocode error: {error}")
+            resolved[i] = country_name
+            print(f"[Row {i}] lat={lat}, lon={lon} -> country={country_name}")
 
-        # Update the country in the original df
-        df.at[i, "country"] = country_name
-        print(f"[Row {i}] lat={lat}, lon={lon} -> country={country_name}")
+    # Update the countries in the original df in one vectorized write
+    if resolved:
+        updates = pd.Series(resolved)
+        df.loc[updates.index, "country"] = updates
 
     # 5. Save the entire df (including updated rows) back to CSV
     df.to_csv(OUTPUT_CSV, index=False)